@@ -52,6 +52,33 @@ runbook_lookup = {
     '11111111-1111-1111-1111-111111111111' : 'AWS-TEST-001'
 }
 
+# Sessions for the Lambda's own account, reused across warm invocations
+
+session_lookup = {}
+
+
+class SharedSession(boto3.Session):
+    """
+    Session for the Lambda's own account that also reuses its clients across warm invocations.
+    Cross-account alerts use a plain boto3.Session, as their assumed-role credentials change
+    with every alert.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(SharedSession, self).__init__(*args, **kwargs)
+        self.client_lookup = {}
+
+    def client(self, service_name, region_name=None, config=None, **kwargs):
+        if kwargs:
+            return super(SharedSession, self).client(service_name, region_name=region_name, config=config, **kwargs)
+
+        key = (service_name, region_name, config)
+
+        if key not in self.client_lookup:
+            self.client_lookup[key] = super(SharedSession, self).client(service_name, region_name=region_name, config=config)
+
+        return self.client_lookup[key]
+
 
 def parse_alert_message(sqs_message):
     """ 
@@ -167,7 +194,9 @@ def lambda_handler(event, context):
             # If the resource is on another account, get the temporary credentials
             self_account_id = context.invoked_function_arn.split(":")[4]
             if parsed_alert['account']['account_number'] == self_account_id:
-                session = boto3.Session(region_name = parsed_alert['region'])
+                if parsed_alert['region'] not in session_lookup:
+                    session_lookup[parsed_alert['region']] = SharedSession(region_name = parsed_alert['region'])
+                session = session_lookup[parsed_alert['region']]
             else:
                 credentials = get_credentials(parsed_alert['account']['account_number'])
                 if credentials['error'] is None:
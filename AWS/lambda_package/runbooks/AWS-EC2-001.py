@@ -37,11 +37,26 @@ Sample IAM Policy:
 }
 """
 
-import boto3
+import logging
+from botocore.config import Config
 from botocore.exceptions import ClientError
-from datetime import datetime
 from datetime import date
 
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Client config: keep the endpoint connection alive between calls and let botocore
+# back off on throttling.
+boto_config = Config(
+  tcp_keepalive = True,
+  connect_timeout = 3,
+  read_timeout = 10,
+  retries = {'mode': 'adaptive', 'max_attempts': 10}
+)
+
+# Error codes still failing after botocore retries; re-raised so the SQS message is redriven
+retryable_errors = ( 'RequestLimitExceeded', 'ConcurrentSnapshotLimitExceeded' )
+
 # Options:
 #
 # Snapshot age in days
@@ -57,16 +72,21 @@ def remediate(session, alert, lambda_context):
   volume_id = alert['resource_id']
   region    = alert['region']
 
-  ec2 = session.client('ec2', region_name=region)
+  ec2 = session.client('ec2', region_name=region, config=boto_config)
 
   try:
-    snapshot = ec2.describe_snapshots(Filters=[{ 'Name': 'volume-id', 'Values': [ volume_id ] }])['Snapshots']
+    snapshots = ec2.describe_snapshots(
+      OwnerIds = [ 'self' ],
+      Filters = [{ 'Name': 'volume-id', 'Values': [ volume_id ] }]
+    )['Snapshots']
   except ClientError as e:
-    print(e.response['Error']['Message'])
+    logger.error('%s', e.response['Error']['Message'])
     return
 
-  if len(snapshot) > 0:
-    snap_date = snapshot[0]['StartTime'].date()    # Snapshot creation date
+  if len(snapshots) > 0:
+    newest = max(snapshots, key=lambda snapshot: snapshot['StartTime'])
+
+    snap_date = newest['StartTime'].date()         # Newest snapshot creation date
     today = date.today()                           # Today's date
     delta = today - snap_date                      # The diff
 
@@ -89,10 +109,11 @@ def new_ebs_snapshot(ec2, volume_id):
     response = ec2.create_snapshot(VolumeId=volume_id, Description='Autoremediate snapshot')
     snapshot_id = response['SnapshotId']
 
-    print('New snapshot {} created for EBS Volume {}.'.format(snapshot_id, volume_id))
+    logger.info('New snapshot %s created for EBS Volume %s.', snapshot_id, volume_id)
 
   except ClientError as e:
-    print(e.response['Error']['Message'])
+    logger.error('%s', e.response['Error']['Message'])
+    if e.response['Error']['Code'] in retryable_errors:
+      raise
 
   return
-
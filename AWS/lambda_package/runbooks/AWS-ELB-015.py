@@ -11,9 +11,9 @@ and identify and troubleshoot security issues.
 Required Permissions:
 
 - elasticloadbalancing:DescribeLoadBalancerAttributes
-- elasticloadbalancing:DescribeLoadBalancers
 - elasticloadbalancing:ModifyLoadBalancerAttributes
 - s3:CreateBucket
+- s3:ListBucket
 - s3:PutBucketPolicy
 - s3:PutObject
 
@@ -26,7 +26,6 @@ Sample IAM Policy:
       "Sid": "ELBPermissions",
       "Action": [
         "elasticloadbalancing:DescribeLoadBalancerAttributes",
-        "elasticloadbalancing:DescribeLoadBalancers",
         "elasticloadbalancing:ModifyLoadBalancerAttributes"
       ],
       "Effect": "Allow",
@@ -36,6 +35,7 @@ Sample IAM Policy:
       "Sid": "S3Permissions",
       "Action": [
         "s3:CreateBucket",
+        "s3:ListBucket",
         "s3:PutBucketPolicy",
         "s3:PutObject"
       ],
@@ -46,51 +46,112 @@ Sample IAM Policy:
 }
 """
 
-import json
-import boto3
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from string import Template
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Client config: keep the endpoint connection alive between calls and let botocore
+# back off on throttling.
+boto_config = Config(
+  tcp_keepalive = True,
+  connect_timeout = 3,
+  read_timeout = 10,
+  retries = {'mode': 'adaptive', 'max_attempts': 10}
+)
+
+# ELB log buckets already set up by this Lambda container
+known_buckets = set()
+
+# ELB account id per region for the access log bucket policy
+#
+# Reference:
+# https://docs.aws.amazon.com/elasticloadbalancing/latest/classic/enable-access-logs.html
+#
+elb_account_lookup = {
+  'us-east-1'     : '127311923021',
+  'us-east-2'     : '033677994240',
+  'us-west-1'     : '027434742980',
+  'us-west-2'     : '797873946194',
+  'ca-central-1'  : '985666609251',
+  'eu-central-1'  : '054676820928',
+  'eu-west-1'     : '156460612806',
+  'eu-west-2'     : '652711504416',
+  'eu-west-3'     : '009996457667',
+  'ap-northeast-1': '582318560864',
+  'ap-northeast-2': '600734575887',
+  'ap-northeast-3': '383597477331',
+  'ap-southeast-1': '114774131450',
+  'ap-southeast-2': '783225319266',
+  'ap-south-1'    : '718504428378',
+  'sa-east-1'     : '507241528517'
+}
+
+# ELB access log bucket policy; only the ELB account, bucket and account id vary
+bucket_policy_template = Template('''{
+  "Version": "2012-10-17",
+  "Statement": [
+    {
+      "Sid": "ELBLoggingPolicy",
+      "Effect": "Allow",
+      "Principal": {
+        "AWS": "arn:aws:iam::${elb_account_id}:root"
+      },
+      "Action": "s3:PutObject",
+      "Resource": "arn:aws:s3:::${bucket_name}/*/AWSLogs/${account_id}/*"
+    },
+    {
+      "Effect": "Allow",
+      "Principal": {
+        "Service": "delivery.logs.amazonaws.com"
+      },
+      "Action": "s3:PutObject",
+      "Resource": "arn:aws:s3:::${bucket_name}/*/AWSLogs/${account_id}/*",
+      "Condition": {
+        "StringEquals": {
+          "s3:x-amz-acl": "bucket-owner-full-control"
+        }
+      }
+    },
+    {
+      "Effect": "Allow",
+      "Principal": {
+        "Service": "delivery.logs.amazonaws.com"
+      },
+      "Action": "s3:GetBucketAcl",
+      "Resource": "arn:aws:s3:::${bucket_name}"
+    }
+  ]
+}''')
+
 
 def remediate(session, alert, lambda_context):
   """
   Main Function invoked by index_prisma.py
   """
 
-  arn      = alert['resource_id']
-  elb_name = arn.split('/')[2]
-  region   = alert['region']
-
-  elbv2 = session.client('elbv2', region_name=region)
-  s3 = session.client('s3', region_name=region)
-
-  try:
-    elb = elbv2.describe_load_balancers(Names=[ elb_name ])['LoadBalancers']
-  except ClientError as e:
-    print(e.response['Error']['Message'])
-    return
-
-  try:
-    elb_arn = elb[0]['LoadBalancerArn']
-  except (KeyError, IndexError):
-    print('Error: Unable to find the ARN for Application ELB {}.'.format(elb_name))
-    return
+  elb_arn    = alert['resource_id']
+  elb_name   = elb_arn.split('/')[2]
+  account_id = elb_arn.split(':')[4]
+  region     = alert['region']
 
-  else:
-    account_id = elb_arn.split(':')[4]
+  elbv2 = session.client('elbv2', region_name=region, config=boto_config)
+  s3    = session.client('s3', region_name=region, config=boto_config)
 
   try:
     attribs = elbv2.describe_load_balancer_attributes(LoadBalancerArn=elb_arn)['Attributes']
   except ClientError as e:
-    print(e.response['Error']['Message'])
+    logger.error('%s', e.response['Error']['Message'])
     return
 
-  logging = 'none'
+  attrib_map = {attrib['Key']: attrib['Value'] for attrib in attribs}
 
-  for attrib in attribs:
-    if attrib['Key'] == 'access_logs.s3.enabled':
-      logging = attrib['Value']
-
-  if logging != 'true':
+  # Alerts can be stale; leave a load balancer that already logs (possibly to its own bucket) alone
+  if attrib_map.get('access_logs.s3.enabled', 'none') != 'true':
 
     bucket_name = new_s3_bucket(s3, elb_name, account_id, region)
 
@@ -125,12 +186,12 @@ def enable_access_log(elbv2, elb_arn, elb_name, bucket_name, region):
     )
   except ClientError as e:
     if 'Access Denied' in e.response['Error']['Message']:
-      print('Access Denied: Check the AWS ELB Account Id for the {} region.'.format(region))
+      logger.error('Access Denied: Check the AWS ELB Account Id for the %s region.', region)
     else:
-      print(e.response['Error']['Message'])
+      logger.error('%s', e.response['Error']['Message'])
 
   else:
-    print('Enabled Access Log for Application ELB {}.'.format(elb_name))
+    logger.info('Enabled Access Log for Application ELB %s.', elb_name)
 
   return
 
@@ -143,116 +204,102 @@ def new_s3_bucket(s3, elb_name, account_id, region):
   bucket_name = 'elbv2logs-' + account_id + '-' + region
 
   try:
-    if region == 'us-east-1':
-      result = s3.create_bucket(
-        ACL = 'private',
-        Bucket = bucket_name
-      )
-    else:
-      result = s3.create_bucket(
-        ACL = 'private',
-        Bucket = bucket_name,
-        CreateBucketConfiguration = {'LocationConstraint': region}
-      )
-
-    print('New S3 bucket created: {}'.format(bucket_name))
-
+    exists = bucket_name in known_buckets or bucket_exists(s3, bucket_name)
   except ClientError as e:
-    if e.response['Error']['Code'] == 'BucketAlreadyExists':
-      print('Using existing S3 bucket: {}'.format(bucket_name))
-    elif e.response['Error']['Code'] == 'BucketAlreadyOwnedByYou':
-      print('Using already owned and existing S3 bucket: {}'.format(bucket_name))
-    else:
-      print(e.response['Error']['Message'])
-      return 'fail'
+    # Forbidden, throttled, etc.; CreateBucket below reports the bucket state
+    logger.info('Unable to check S3 bucket %s (%s), trying to create it.', bucket_name, e.response['Error']['Code'])
+    exists = False
 
-  # Create ELB folder/ prefix
-  try:
-    result = s3.put_object(
+  if exists:
+    logger.info('Using already owned and existing S3 bucket: %s', bucket_name)
+
+  else:
+    try:
+      if region == 'us-east-1':
+        result = s3.create_bucket(
+          ACL = 'private',
+          Bucket = bucket_name
+        )
+      else:
+        result = s3.create_bucket(
+          ACL = 'private',
+          Bucket = bucket_name,
+          CreateBucketConfiguration = {'LocationConstraint': region}
+        )
+
+      logger.info('New S3 bucket created: %s', bucket_name)
+
+    except ClientError as e:
+      if e.response['Error']['Code'] == 'BucketAlreadyExists':
+        logger.info('Using existing S3 bucket: %s', bucket_name)
+      elif e.response['Error']['Code'] == 'BucketAlreadyOwnedByYou':
+        logger.info('Using already owned and existing S3 bucket: %s', bucket_name)
+      else:
+        logger.error('%s', e.response['Error']['Message'])
+        return 'fail'
+
+  # Create ELB folder/ prefix and ELB logging policy concurrently; both only
+  # need the bucket to exist
+  with ThreadPoolExecutor(max_workers=2) as executor:
+    prefix = executor.submit(
+      s3.put_object,
       Bucket = bucket_name,
       Key = elb_name +'/'
     )
+    policy = executor.submit(
+      s3.put_bucket_policy,
+      Bucket = bucket_name,
+      Policy = bucket_policy_json(bucket_name, account_id, region)
+    )
+
+  result = bucket_name
+
+  try:
+    prefix.result()
   except ClientError as e:
-    print(e.response['Error']['Message'])
-    return 'fail'
+    logger.error('%s', e.response['Error']['Message'])
+    result = 'fail'
 
-  # Create ELB logging policy
   try:
-    result = s3.put_bucket_policy(
-      Bucket = bucket_name,
-      Policy = json.dumps(BucketTemplate.BucketPolicy(bucket_name, account_id, region))
-    )
+    policy.result()
   except ClientError as e:
     if 'Invalid principal' in e.response['Error']['Message']:
-      print('Invalid principal: Check the AWS ELB Account Id for the {} region.'.format(region))
+      logger.error('Invalid principal: Check the AWS ELB Account Id for the %s region.', region)
     else:
-      print(e.response['Error']['Message'])
-    return 'fail'
-
-  return bucket_name
-
-
-class BucketTemplate():
-
-  def BucketPolicy(bucket_name, account_id, region):
-
-    elb_account_id = '123456789012'
-
-    # Reference:
-    # https://docs.aws.amazon.com/elasticloadbalancing/latest/classic/enable-access-logs.html
-
-    if region == 'us-east-1':      elb_account_id = '127311923021'
-    if region == 'us-east-2':      elb_account_id = '033677994240'
-    if region == 'us-west-1':      elb_account_id = '027434742980'
-    if region == 'us-west-2':      elb_account_id = '797873946194'
-    if region == 'ca-central-1':   elb_account_id = '985666609251'
-    if region == 'eu-central-1':   elb_account_id = '054676820928'
-    if region == 'eu-west-1':      elb_account_id = '156460612806'
-    if region == 'eu-west-2':      elb_account_id = '652711504416'
-    if region == 'eu-west-3':      elb_account_id = '009996457667'
-    if region == 'ap-northeast-1': elb_account_id = '582318560864'
-    if region == 'ap-northeast-2': elb_account_id = '600734575887'
-    if region == 'ap-northeast-3': elb_account_id = '383597477331'
-    if region == 'ap-southeast-1': elb_account_id = '114774131450'
-    if region == 'ap-southeast-2': elb_account_id = '783225319266'
-    if region == 'ap-south-1':     elb_account_id = '718504428378'
-    if region == 'sa-east-1':      elb_account_id = '507241528517'
-
-    Policy = {
-               'Version': '2012-10-17',
-               'Statement': [
-                 {
-                   'Sid': 'ELBLoggingPolicy',
-                   'Effect': 'Allow',
-                   'Principal': {
-                     'AWS': 'arn:aws:iam::' + elb_account_id + ':root'
-                   },
-                   'Action': 's3:PutObject',
-                   'Resource': 'arn:aws:s3:::' + bucket_name + '/*' + '/AWSLogs/' + account_id + '/*'
-                 },
-                 {
-                   'Effect': 'Allow',
-                   'Principal': {
-                   'Service': 'delivery.logs.amazonaws.com'
-                   },
-                   'Action': 's3:PutObject',
-                   'Resource': 'arn:aws:s3:::' + bucket_name + '/*' + '/AWSLogs/' + account_id + '/*',
-                   'Condition': {
-                     'StringEquals': {
-                       's3:x-amz-acl': 'bucket-owner-full-control'
-                     }
-                   }
-                 },
-                 {
-                   'Effect': 'Allow',
-                   'Principal': {
-                   'Service': 'delivery.logs.amazonaws.com'
-                   },
-                   'Action': 's3:GetBucketAcl',
-                   'Resource': 'arn:aws:s3:::' + bucket_name
-                 }
-               ]
-             }
-
-    return Policy
+      logger.error('%s', e.response['Error']['Message'])
+    result = 'fail'
+
+  # Forget the bucket on failure (it may have been deleted) so the next alert checks it again
+  if result != 'fail':
+    known_buckets.add(bucket_name)
+  else:
+    known_buckets.discard(bucket_name)
+
+  return result
+
+
+def bucket_exists(s3, bucket_name):
+  """
+  Check whether the S3 Bucket exists; errors other than not found are raised
+  """
+
+  try:
+    s3.head_bucket(Bucket=bucket_name)
+  except ClientError as e:
+    if e.response['Error']['Code'] in ('404', 'NoSuchBucket'):
+      return False
+    raise
+
+  return True
+
+
+def bucket_policy_json(bucket_name, account_id, region):
+  """
+  Return the ELB access log bucket policy as JSON
+  """
 
+  return bucket_policy_template.substitute(
+    elb_account_id = elb_account_lookup.get(region, '123456789012'),
+    bucket_name = bucket_name,
+    account_id = account_id
+  )
@@ -31,9 +31,25 @@ Sample IAM Policy:
 }
 """
 
-import boto3
+import logging
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Client config: keep the endpoint connection alive between calls and let botocore
+# back off on throttling.
+boto_config = Config(
+  tcp_keepalive = True,
+  connect_timeout = 3,
+  read_timeout = 10,
+  retries = {'mode': 'adaptive', 'max_attempts': 10}
+)
+
+# Error codes still failing after botocore retries; re-raised so the SQS message is redriven
+retryable_errors = ( 'Throttling', 'CallerRateLimitExceeded' )
+
 
 def remediate(session, alert, lambda_context):
   """
@@ -43,7 +59,13 @@ def remediate(session, alert, lambda_context):
   resource_id = alert['resource_id']
   region      = alert['region']
 
-  rds = session.client('rds', region_name=region)
+  rds = session.client('rds', region_name=region, config=boto_config)
+
+  # Prisma alert metadata carries the instance identifier; ModifyDBInstance is
+  # idempotent, so the DescribeDBInstances pre-check is only needed without it
+  if 'dbinstanceIdentifier' in alert['metadata']:
+    make_private(rds, alert['metadata']['dbinstanceIdentifier'])
+    return
 
   try:
     db_instance = rds.describe_db_instances(
@@ -56,7 +78,7 @@ def remediate(session, alert, lambda_context):
     )['DBInstances']
     
   except ClientError as e:
-    print(e.response['Error']['Message'])
+    logger.error('%s', e.response['Error']['Message'])
     return
 
   try:
@@ -65,20 +87,27 @@ def remediate(session, alert, lambda_context):
     public = False
 
   if public == True: 
+    make_private(rds, db_instance[0]['DBInstanceIdentifier'])
 
-    instance_id = db_instance[0]['DBInstanceIdentifier']
+  return
 
-    try:
-      rds.modify_db_instance(
-        DBInstanceIdentifier = instance_id,
-        PubliclyAccessible = False
-      )
-    except ClientError as e:
-      print(e.response['Error']['Message'])
-      return
 
-    else:
-      print('Removed public attribute from RDS instance {}.'.format(instance_id))
+def make_private(rds, instance_id):
+  """
+  Remove the RDS instance public attribute
+  """
 
-  return
+  try:
+    rds.modify_db_instance(
+      DBInstanceIdentifier = instance_id,
+      PubliclyAccessible = False
+    )
+  except ClientError as e:
+    logger.error('%s', e.response['Error']['Message'])
+    if e.response['Error']['Code'] in retryable_errors:
+      raise
+
+  else:
+    logger.info('Removed public attribute from RDS instance %s.', instance_id)
 
+  return
@@ -49,6 +49,7 @@ resource "aws_iam_role_policy" "lambda_policy" {
           "Action": [
             "sts:GetCallerIdentity",
             "s3:CreateBucket",
+            "s3:ListBucket",
             "s3:GetBucketLogging",
             "s3:PutBucketLogging",
             "ec2:DescribeSecurityGroups",